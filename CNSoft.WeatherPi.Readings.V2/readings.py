@@ -26,20 +26,24 @@ import paho.mqtt.client as mqtt_client
 import random
 import socket
 import json
-import jsonpickle
 import ssl
 import logging
 import math
+from dataclasses import dataclass, field
 import signal
+import threading
+import queue
 import sys
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Tuple, Dict
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
 
-# Global shutdown flag for graceful termination
-shutdown_requested = False
+# Global shutdown event for graceful termination; waiting on it lets
+# sleeping threads wake as soon as a shutdown is requested
+shutdown_event = threading.Event()
 
 # Custom object to hold broker details
+@dataclass(frozen=True, slots=True)
 class broker:
     """Simple container for MQTT broker connection details.
 
@@ -52,13 +56,7 @@ class broker:
     brokerfqdn: str
     brokerport: int
     brokerusername: str
-    brokerpassword: str
-
-    def __init__(self, brokerfqdn: str, brokerport: int, brokerusername: str, brokerpassword: str) -> None:
-        self.brokerfqdn = brokerfqdn
-        self.brokerport = brokerport
-        self.brokerusername = brokerusername
-        self.brokerpassword = brokerpassword
+    brokerpassword: str = field(repr=False)
 
 SIMULATE_SENSORS = os.environ.get('SIMULATE_SENSORS', '').lower() in ('1', 'true', 'yes')
 
@@ -66,6 +64,13 @@ if SIMULATE_SENSORS:
     logging.warning("SIMULATE_SENSORS enabled; using fake sensor readings")
 
     class FakeBME280:
+        temperature: float = 21.5
+        pressure: float = 1013.25
+        humidity: float = 45.0
+
+        def update_sensor(self) -> None:
+            return None
+
         def get_temperature(self) -> float:
             return 21.5
 
@@ -90,8 +95,9 @@ else:
     bus = SMBus(1)
     bme280 = BME280(i2c_dev=bus)
 
-    # Initialise the BH1745 (colour and lux sensor)
-    bh1745 = BH1745()
+    # Initialise the BH1745 (colour and lux sensor) on the same SMBus
+    # handle, so every access goes through one handle guarded by bus_lock
+    bh1745 = BH1745(i2c_dev=bus)
     bh1745.setup()
 
 # Parse command line for optional config file
@@ -105,8 +111,77 @@ default_config = os.path.join(script_dir, 'readings.ini')
 
 config_path = args.configfile if args.configfile else default_config
 
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Immutable application settings resolved once at startup.
+
+    Built by `load_config` from environment variables and `readings.ini`
+    and passed explicitly to the functions that need it.
+    """
+    brokers: Tuple[broker, ...]
+    topic: str
+    refresh_interval: int
+    usesql: bool
+    dbserver: str
+    dbname: str
+    dbusername: str
+    dbpassword: str = field(repr=False)
+    dbbatchsize: int
+    cal_temp: float
+    cal_pressure: float
+    cal_humidity: float
+    cal_lux: float
+
+def parse_brokers(brokers_data: str) -> Tuple[broker, ...]:
+    """Build `broker` instances from a JSON list of broker objects.
+
+    Each object holds the `broker` constructor arguments. The
+    `py/object` key written by older jsonpickle-based configs is
+    ignored so existing settings keep working.
+    """
+    return tuple(
+        broker(**{k: v for k, v in d.items() if k != 'py/object'})
+        for d in json.loads(brokers_data)
+    )
+
+# readings.ini sections holding settings; their keys do not overlap
+CONFIG_SECTIONS = ('broker', 'db', 'calibration')
+
+# Default for every optional setting, keyed by its name in readings.ini
+CONFIG_DEFAULTS: Dict[str, str] = {
+    'topic': 'Weatherstation/',
+    'refresh': '300',
+    'usesql': 'False',
+    'server': '',
+    'database': '',
+    'username': '',
+    'password': '',
+    'batchsize': '12',
+    'temperature': '0.0',
+    'pressure': '0.0',
+    'humidity': '0.0',
+    'lux': '0.0',
+}
+
+# Environment variables that override readings.ini, mapped to the ini key
+CONFIG_ENV_VARS: Dict[str, str] = {
+    'MQTT_BROKERS': 'brokers',
+    'MQTT_TOPIC': 'topic',
+    'MQTT_REFRESH': 'refresh',
+    'DB_USE_SQL': 'usesql',
+    'DB_SERVER': 'server',
+    'DB_NAME': 'database',
+    'DB_USERNAME': 'username',
+    'DB_PASSWORD': 'password',
+    'DB_BATCH_SIZE': 'batchsize',
+    'CAL_TEMPERATURE': 'temperature',
+    'CAL_PRESSURE': 'pressure',
+    'CAL_HUMIDITY': 'humidity',
+    'CAL_LUX': 'lux',
+}
+
 # Function to load configuration from environment variables or config file
-def load_config():
+def load_config() -> Config:
     """Load configuration from environment variables with fallback to config file.
     
     Environment variables override config file settings. This allows Docker containers
@@ -121,62 +196,122 @@ def load_config():
     else:
         logging.warning("Config file not found: %s. Using environment variables.", config_path)
     
+    # Layer the settings: defaults, then readings.ini, then environment
+    file_cfg: Dict[str, str] = {}
+    if config_file_exists:
+        for section in CONFIG_SECTIONS:
+            if config.has_section(section):
+                file_cfg.update(config[section])
+    env_cfg = {key: os.environ[name] for name, key in CONFIG_ENV_VARS.items() if name in os.environ}
+    merged = CONFIG_DEFAULTS | file_cfg | env_cfg
+
     # Load MQTT broker configuration
-    brokers_data = os.environ.get('MQTT_BROKERS')
+    brokers_data = env_cfg.get('brokers')
     if brokers_data:
         try:
-            brokers_config = jsonpickle.decode(brokers_data)
+            brokers_config = parse_brokers(brokers_data)
             logging.info("MQTT brokers loaded from env: MQTT_BROKERS")
-        except (TypeError, ValueError) as e:
+        except (AttributeError, TypeError, ValueError) as e:
             logging.error("Failed to parse MQTT_BROKERS env var: %s", e)
-            if config_file_exists:
-                brokers_config = jsonpickle.decode(config.get('broker', 'brokers'))
+            if 'brokers' in file_cfg:
+                brokers_config = parse_brokers(file_cfg['brokers'])
             else:
-                raise ValueError("MQTT_BROKERS env var is invalid and no config file found") from e
-    elif config_file_exists:
-        brokers_config = jsonpickle.decode(config.get('broker', 'brokers'))
+                raise ValueError("MQTT_BROKERS env var is invalid and no brokers in config file") from e
+    elif 'brokers' in file_cfg:
+        brokers_config = parse_brokers(file_cfg['brokers'])
     else:
-        raise ValueError("MQTT_BROKERS env var not set and no config file found")
-    
-    # Load MQTT topic
-    topic_config = os.environ.get('MQTT_TOPIC', config.get('broker', 'topic', fallback='Weatherstation/'))
-    
-    # Load refresh interval
-    refresh_str = os.environ.get('MQTT_REFRESH', config.get('broker', 'refresh', fallback='300'))
-    refresh_interval_config = int(refresh_str)
-    
-    # Load database configuration
-    usesql_config = os.environ.get('DB_USE_SQL', config.get('db', 'usesql', fallback='False')).lower() in ('true', '1', 'yes')
-    dbserver_config = os.environ.get('DB_SERVER', config.get('db', 'server', fallback=''))
-    dbname_config = os.environ.get('DB_NAME', config.get('db', 'database', fallback=''))
-    dbusername_config = os.environ.get('DB_USERNAME', config.get('db', 'username', fallback=''))
-    dbpassword_config = os.environ.get('DB_PASSWORD', config.get('db', 'password', fallback=''))
-    
-    # Load calibration offsets
-    cal_temp_config = float(os.environ.get('CAL_TEMPERATURE', config.get('calibration', 'temperature', fallback='0.0')))
-    cal_pressure_config = float(os.environ.get('CAL_PRESSURE', config.get('calibration', 'pressure', fallback='0.0')))
-    cal_humidity_config = float(os.environ.get('CAL_HUMIDITY', config.get('calibration', 'humidity', fallback='0.0')))
-    cal_lux_config = float(os.environ.get('CAL_LUX', config.get('calibration', 'lux', fallback='0.0')))
-    
-    return (
-        brokers_config,
-        topic_config,
-        refresh_interval_config,
-        usesql_config,
-        dbserver_config,
-        dbname_config,
-        dbusername_config,
-        dbpassword_config,
-        cal_temp_config,
-        cal_pressure_config,
-        cal_humidity_config,
-        cal_lux_config,
+        raise ValueError("MQTT_BROKERS env var not set and no brokers in config file")
+
+    return Config(
+        brokers=brokers_config,
+        topic=merged['topic'],
+        refresh_interval=int(merged['refresh']),
+        usesql=merged['usesql'].lower() in ('true', '1', 'yes'),
+        dbserver=merged['server'],
+        dbname=merged['database'],
+        dbusername=merged['username'],
+        dbpassword=merged['password'],
+        dbbatchsize=max(int(merged['batchsize']), 1),
+        cal_temp=float(merged['temperature']),
+        cal_pressure=float(merged['pressure']),
+        cal_humidity=float(merged['humidity']),
+        cal_lux=float(merged['lux']),
     )
 
-# Load configuration
-brokers, topic, refresh_interval, usesql, dbserver, dbname, dbusername, dbpassword, cal_temp, cal_pressure, cal_humidity, cal_lux = load_config()
+# Load configuration once; everything downstream receives this instance
+cfg = load_config()
 clients: List[mqtt_client.Client] = []
 
+# Readings waiting to be written to the database. Rows are flushed in a
+# single multi-row INSERT once `cfg.dbbatchsize` readings have accumulated (or
+# on shutdown) and are only discarded after a successful commit.
+pending_rows: List[Tuple[float, float, float, float, float]] = []
+
+# Parametrised INSERT statement used for every flush. `executemany` with
+# a plain INSERT ... VALUES lets the connector send the whole batch as a
+# single multi-row statement.
+INSERT_READING_SQL = "INSERT INTO Readings (Humidity, Pressure, Temperature, Lux, AmbientLux) VALUES (%s, %s, %s, %s, %s)"
+
+# Prefer the connector's C extension; switched to the pure-Python
+# implementation on first connect if the extension is not installed.
+db_use_pure = False
+
+# Serialises access to the I2C bus shared by the BME280 and BH1745
+bus_lock = threading.Lock()
+
+# Raw (temperature, pressure, humidity, clear channel) readings handed from
+# the sensor thread to the publishing loop; `None` marks the thread's exit
+sensor_q: "queue.Queue[Optional[Tuple[float, float, float, int]]]" = queue.Queue(maxsize=8)
+
+# Temperature, humidity and pressure (in tenths) reported by the BME280
+# on its known-bad startup read: 22.0 C, 82.3 %, 684.3 hPa
+STARTUP_FINGERPRINT = (220, 823, 6843)
+
+# Log only every Nth bad startup reading to avoid flooding the log
+BAD_READING_LOG_EVERY = 10
+
+# Magnus constants for water vapour over liquid water, used for dew point
+MAGNUS_A = 17.27
+MAGNUS_B = 237.7
+INV_100 = 0.01
+LOG = math.log
+
+# Maximum number of batches kept in `pending_rows` while the DB is
+# unreachable; the oldest readings are dropped beyond this
+DB_MAX_PENDING_BATCHES = 24
+
+# Errors meaning the server rejected the batch itself (bad values, duplicate
+# keys, schema mismatch); retrying cannot help, so the batch is discarded.
+# Any other DB error (including a plain DatabaseError such as 2006 "server
+# has gone away") is treated as a lost connection and the rows are kept.
+DB_REJECTED_ERRORS = (mysql.connector.errors.DataError, mysql.connector.errors.IntegrityError, mysql.connector.errors.ProgrammingError)
+
+# Every error the DB driver may raise. The C extension raises its own
+# MySQLInterfaceError from commit()/rollback()/close(), which does not
+# derive from mysql.connector.Error.
+DB_ERRORS: Tuple[type, ...] = (mysql.connector.Error,)
+try:
+    from _mysql_connector import MySQLInterfaceError
+except ImportError:
+    # C extension not installed or not loadable; only the pure-Python errors apply
+    pass
+else:
+    DB_ERRORS += (MySQLInterfaceError,)
+
+# Bounds (seconds) for the exponential backoff between DB reconnect attempts
+DB_RECONNECT_MIN_DELAY = 0.5
+DB_RECONNECT_MAX_DELAY = 30.0
+
+# TLS context shared by every broker on port 8883 so the CA bundle is
+# loaded once. Certificates are verified but host names are not, as before.
+tls_context = ssl.create_default_context()
+tls_context.check_hostname = False
+tls_context.verify_mode = ssl.CERT_REQUIRED
+
+# Bounds (seconds) for paho's automatic MQTT reconnect backoff
+MQTT_RECONNECT_MIN_DELAY = 1
+MQTT_RECONNECT_MAX_DELAY = 60
+
 # Generate a unique client ID
 client_id: str = f'{socket.gethostname()}_s-{random.randint(0, 1000)}'
 # The ID above combines the host name and a small random suffix to
@@ -186,19 +321,31 @@ client_id: str = f'{socket.gethostname()}_s-{random.randint(0, 1000)}'
 # Perform an initial (warm-up) read from sensors. These initial values
 # are known to be unreliable for these devices, so we discard them after
 # a short delay. Keeping the call here ensures later readings are stable.
-temperature: float = bme280.get_temperature()
-pressure: float = bme280.get_pressure()
-humidity: float = bme280.get_humidity()
+bme280.update_sensor()
+temperature: float = bme280.temperature
+pressure: float = bme280.pressure
+humidity: float = bme280.humidity
 _r_raw, _g_raw, _b_raw, _c_raw = bh1745.get_rgbc_raw()
 time.sleep(1)
 
+def on_socket_open(_client, _userdata, sock) -> None:
+    """Disable Nagle's algorithm on each new MQTT socket.
+
+    Readings are small single packets, so sending them immediately
+    rather than coalescing cuts publish latency.
+    """
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except (OSError, AttributeError) as e:
+        logging.debug("Could not set TCP_NODELAY on MQTT socket: %s", e)
+
 def connect_mqtt(brokerep: broker) -> mqtt_client.Client:
     """Create and connect an MQTT client for the given broker.
 
     brokerep should be an instance of `broker` containing connection
-    details. Returns a started `paho.mqtt.client.Client` instance
-    (network loop started) or a client with the loop started even if
-    the initial connect failed.
+    details. Returns a `paho.mqtt.client.Client` whose network loop
+    has been started; the connection itself is established (and
+    re-established after drops) asynchronously by that loop.
     """
     def on_connect(_client, _userdata, _flags, rc):
         if rc == 0:
@@ -220,189 +367,385 @@ def connect_mqtt(brokerep: broker) -> mqtt_client.Client:
     else:
         client = mqtt_client.Client(client_id=client_id_instance, protocol=mqtt_client.MQTTv311)
 
-    # Set up TLS if port 8883 is used
+    # Set up TLS if port 8883 is used, sharing one context across brokers
     if brokerep.brokerport == 8883:
-        client.tls_set(certfile=None, keyfile=None, cert_reqs=ssl.CERT_REQUIRED)
+        client.tls_set_context(tls_context)
         client.tls_insecure_set(True)
 
     client.username_pw_set(brokerep.brokerusername, brokerep.brokerpassword)
     client.on_connect = on_connect
+    client.on_socket_open = on_socket_open
+    # Let paho's network thread perform the initial connect and any later
+    # reconnects (with backoff) instead of blocking the caller
+    client.reconnect_delay_set(min_delay=MQTT_RECONNECT_MIN_DELAY, max_delay=MQTT_RECONNECT_MAX_DELAY)
     try:
-        client.connect(brokerep.brokerfqdn, brokerep.brokerport)
-        # Start network loop in background so client maintains connection and can reconnect
-        client.loop_start()
-        time.sleep(1)
-        logging.info("MQTT client loop started for %s", brokerep.brokerfqdn)
-    except (OSError, RuntimeError) as e:
-        logging.error("Failed to connect/start MQTT client for %s: %s", brokerep.brokerfqdn, e)
-        # Start loop anyway to allow client to attempt background reconnects if possible
-        try:
-            client.loop_start()
-        except RuntimeError:
-            pass
+        client.connect_async(brokerep.brokerfqdn, brokerep.brokerport)
+    except ValueError as e:
+        logging.error("Invalid MQTT broker settings for %s: %s", brokerep.brokerfqdn, e)
+        return client
+    client.loop_start()
+    logging.info("MQTT client loop started for %s", brokerep.brokerfqdn)
     return client
 
-def connect_db() -> Optional[Any]:
+def connect_db(cfg: Config) -> Optional[Any]:
     """Connect to the MySQL database and return a connection object.
 
     Returns a `mysql.connector` connection on success or `None` on
     failure. Caller should check the result before using it.
     """
+    global db_use_pure
+    connect_args = {
+        'host': cfg.dbserver,
+        'database': cfg.dbname,
+        'user': cfg.dbusername,
+        'password': cfg.dbpassword,
+        'autocommit': False,
+    }
     try:
-        conn = mysql.connector.connect(
-            host=dbserver,
-            database=dbname,
-            user=dbusername,
-            password=dbpassword,
-            autocommit=False,
-        )
-        logging.info("Connected to DB %s", dbname)
+        try:
+            conn = mysql.connector.connect(use_pure=db_use_pure, **connect_args)
+        except ImportError as e:
+            # No C extension wheel (e.g. on a Pi Zero); use the pure-Python protocol
+            logging.warning("MySQL C extension unavailable (%s); falling back to use_pure=True", e)
+            db_use_pure = True
+            conn = mysql.connector.connect(use_pure=True, **connect_args)
+        logging.info("Connected to DB %s", cfg.dbname)
         return conn
-    except mysql.connector.Error as e:
+    except DB_ERRORS as e:
         logging.error("Database connection failed: %s", e)
         return None
 
-def publish_sensor(mqtt_clients: List[mqtt_client.Client], conn: Optional[mysql.connector.connection.MySQLConnection]) -> None:
-    """Main sensor read loop.
+def reconnect_db(cfg: Config) -> Tuple[Optional[Any], Optional[Any]]:
+    """Open a fresh DB connection and cursor.
 
-    This function runs an infinite loop that reads sensor values,
-    applies calibration offsets from the config file, computes derived
-    metrics (lux, dew point, corrected humidity), optionally inserts
-    the readings into the configured SQL database, and publishes a
-    JSON payload to the configured MQTT topic for each connected
-    client.
+    Returns a `(connection, cursor)` pair, or `(None, None)` if either
+    the connection or the cursor could not be created.
+    """
+    conn = connect_db(cfg)
+    if conn is None:
+        return None, None
+    try:
+        return conn, conn.cursor()
+    except DB_ERRORS as e:
+        logging.error("Failed to create DB cursor after reconnect: %s", e)
+        try:
+            conn.close()
+        except DB_ERRORS:
+            pass
+        return None, None
+
+def flush_readings(conn: Any, cursor: Any) -> None:
+    """Write all buffered readings to the database in one transaction.
+
+    Sends everything in `pending_rows` with a single `executemany` and
+    commits once. If the server rejects the batch (one of
+    `DB_REJECTED_ERRORS`: bad data, schema mismatch) retrying cannot help,
+    so the batch is logged and discarded. Any other error from `DB_ERRORS`
+    means the connection is unusable and is re-raised with the buffer left
+    untouched so the rows can be retried on a new connection.
+    """
+    if not pending_rows:
+        return
+    # The cursor is deliberately not a prepared one: a prepared cursor's
+    # executemany makes one round-trip per row instead of a single
+    # multi-row INSERT.
+    try:
+        cursor.executemany(INSERT_READING_SQL, pending_rows)
+        conn.commit()
+    except DB_REJECTED_ERRORS as e:
+        logging.error("Database rejected %d buffered readings; discarding them: %s", len(pending_rows), e)
+        try:
+            conn.rollback()
+        except DB_ERRORS:
+            pass
+        pending_rows.clear()
+        return
+    logging.debug("Flushed %d readings to DB", len(pending_rows))
+    pending_rows.clear()
+
+class DbWriter:
+    """Buffers readings in `pending_rows` and writes them to the database.
+
+    Owns the live DB connection for the publishing loop. The connection is
+    not pinged up front. A connection error on an established connection
+    (e.g. one the server timed out) triggers one immediate reconnect and
+    retry; a failed reconnect, or a failure on a fresh connection, backs
+    off exponentially before the next attempt.
     """
-    cursor = None
-    if usesql:
+
+    def __init__(self, cfg: Config, conn: Optional[Any]) -> None:
+        self.cfg = cfg
+        self.conn = conn
+        self.cursor = None
+        self.retry_delay = DB_RECONNECT_MIN_DELAY
+        self.retry_at = 0.0
+        self.max_pending_rows = cfg.dbbatchsize * DB_MAX_PENDING_BATCHES
         if conn is not None:
             try:
-                cursor = conn.cursor()
-            except mysql.connector.Error as e:
+                self.cursor = conn.cursor()
+            except DB_ERRORS as e:
                 logging.error("Failed to create DB cursor at startup: %s", e)
-                conn = None
+                self._drop_connection()
         else:
             logging.warning("usesql=True but no DB connection provided at startup")
 
-    while not shutdown_requested:
+    def add_reading(self, row: Tuple[float, float, float, float, float]) -> None:
+        """Buffer one row and write the buffer once a full batch is ready."""
+        pending_rows.append(row)
+        overflow = len(pending_rows) - self.max_pending_rows
+        if overflow > 0:
+            # Bound memory use while the DB stays unreachable
+            del pending_rows[:overflow]
+            logging.warning("DB write backlog full; dropped %d oldest buffered readings", overflow)
+        if len(pending_rows) >= self.cfg.dbbatchsize:
+            self.write()
+
+    def write(self) -> None:
+        """Flush `pending_rows`, reconnecting and backing off as needed."""
+        for _attempt in range(2):
+            fresh_conn = False
+            if self.conn is None:
+                if time.monotonic() < self.retry_at:
+                    return
+                self.conn, self.cursor = reconnect_db(self.cfg)
+                if self.conn is None:
+                    self._back_off()
+                    return
+                fresh_conn = True
+            try:
+                flush_readings(self.conn, self.cursor)
+                self.retry_delay = DB_RECONNECT_MIN_DELAY
+                return
+            except DB_ERRORS as e:
+                logging.error("Database insert failed; keeping %d buffered readings: %s", len(pending_rows), e)
+                self._drop_connection()
+                if fresh_conn:
+                    self._back_off()
+                    return
+
+    def flush_on_shutdown(self) -> None:
+        """Write out any readings still buffered, ignoring the backoff."""
+        if not pending_rows:
+            return
+        if self.conn is None:
+            self.conn, self.cursor = reconnect_db(self.cfg)
+        if self.conn is None:
+            logging.error("Discarding %d buffered readings; no DB connection on shutdown", len(pending_rows))
+            return
         try:
-            # Obtain readings from the sensors
-            temperature_reading = bme280.get_temperature()
-            pressure_reading = bme280.get_pressure()
-            humidity_reading = bme280.get_humidity()
-            _, _, _, clear_channel = bh1745.get_rgbc_raw()
+            flush_readings(self.conn, self.cursor)
+        except DB_ERRORS as e:
+            logging.error("Failed to flush %d buffered readings on shutdown: %s", len(pending_rows), e)
 
-            # Apply per-sensor calibration offsets (configurable in readings.ini)
-            try:
-                temperature_reading = temperature_reading + cal_temp
-            except TypeError:
-                logging.exception("Failed to apply temperature calibration")
-            try:
-                pressure_reading = pressure_reading + cal_pressure
-            except TypeError:
-                logging.exception("Failed to apply pressure calibration")
-            try:
-                humidity_reading = humidity_reading + cal_humidity
-            except TypeError:
-                logging.exception("Failed to apply humidity calibration")
+    def close(self) -> None:
+        """Close whichever connection is live now.
+
+        It may be one opened by a reconnect rather than the one passed in.
+        """
+        if self.conn is not None:
+            self._drop_connection()
+
+    def _drop_connection(self) -> None:
+        try:
+            self.conn.close()
+        except DB_ERRORS:
+            pass
+        self.conn = None
+        self.cursor = None
+
+    def _back_off(self) -> None:
+        self.retry_at = time.monotonic() + self.retry_delay
+        self.retry_delay = min(self.retry_delay * 2, DB_RECONNECT_MAX_DELAY)
+
+def read_sensors(refresh_interval: int) -> None:
+    """Sensor reader thread.
+
+    Reads the BME280 and BH1745 once per `refresh_interval` while holding
+    `bus_lock`, and hands the raw values to the publisher via `sensor_q`.
+    Readings are dropped if the publisher falls behind and the queue is
+    full. On exit a `None` sentinel is queued so the publisher stops
+    waiting immediately.
+    """
+    # update_sensor() reads the BME280 data registers once and compensates
+    # all three values; the get_*() helpers would each repeat that read
+    update_bme280 = bme280.update_sensor
+    get_rgbc_raw = bh1745.get_rgbc_raw
+    _monotonic = time.monotonic
+    # Absolute deadline of the next reading, so the loop's own work time
+    # does not push the sampling cadence later on every iteration
+    next_reading_at = _monotonic()
+
+    try:
+        while not shutdown_event.is_set():
             try:
-                # Apply lux calibration to the raw c channel before conversion
-                clear_channel = clear_channel + cal_lux
-            except TypeError:
-                logging.exception("Failed to apply lux calibration")
+                with bus_lock:
+                    update_bme280()
+                    temperature = bme280.temperature
+                    pressure = bme280.pressure
+                    humidity = bme280.humidity
+                    _, _, _, clear_channel = get_rgbc_raw()
+            except (OSError, RuntimeError, ValueError):
+                logging.exception("Failed to read sensors; retrying next interval")
+            else:
+                try:
+                    sensor_q.put_nowait((temperature, pressure, humidity, clear_channel))
+                except queue.Full:
+                    logging.warning("Sensor queue full; dropping reading")
+
+            # Wait until the next scheduled reading
+            next_reading_at += refresh_interval
+            delay = next_reading_at - _monotonic()
+            if delay > 0:
+                if shutdown_event.wait(delay):
+                    break
+            else:
+                # We fell behind (e.g. a slow sensor); resync to now
+                next_reading_at = _monotonic()
+    finally:
+        # Wake the publisher, which may be blocked waiting for a reading
+        try:
+            sensor_q.put_nowait(None)
+        except queue.Full:
+            pass
+
+def publish_sensor(mqtt_clients: List[mqtt_client.Client], conn: Optional[mysql.connector.connection.MySQLConnection], cfg: Config, sensor_thread: threading.Thread) -> None:
+    """Main sensor publishing loop.
+
+    This function runs an infinite loop that takes raw sensor values
+    from `sensor_q` (filled by `read_sensors`), applies calibration offsets from the config file, computes derived
+    metrics (lux, dew point, corrected humidity), optionally inserts
+    the readings into the configured SQL database, and publishes a
+    JSON payload to the configured MQTT topic for each connected
+    client. Takes ownership of `conn` and closes the live DB connection
+    on return. Raises `RuntimeError` if `sensor_thread` dies before a
+    shutdown was requested, so the process exits and gets restarted.
+    """
+    db_writer = DbWriter(cfg, conn) if cfg.usesql else None
+    # Build the publish topic once rather than per client per reading
+    full_topic = cfg.topic + "WeatherData"
+    # Allow one missed interval before reporting that readings stopped
+    reading_timeout = cfg.refresh_interval * 2
+
+    # Bind hot-loop globals and methods to locals once so each iteration
+    # uses fast local lookups instead of global/attribute resolution
+    get_reading = sensor_q.get
+    cal_temp, cal_pressure, cal_humidity, cal_lux = cfg.cal_temp, cfg.cal_pressure, cfg.cal_humidity, cfg.cal_lux
+    _round = round
+    _log = LOG
+    _debug = logging.debug
+    _warning = logging.warning
+    bad_readings = 0
 
-            # Calculate lux from colour sensor data
-            lx_tmp = clear_channel / 1.638375
-            lx = min(max(round(lx_tmp, -2), 0), 40000)
-            ambient_lux = min(lx, 10000)
+    try:
+        while not shutdown_event.is_set():
+            # Wait for the next raw reading from the sensor thread
+            try:
+                reading = get_reading(timeout=reading_timeout)
+            except queue.Empty:
+                if not sensor_thread.is_alive():
+                    break
+                _warning("No sensor reading received in %s seconds", reading_timeout)
+                continue
+            if reading is None:
+                # Sensor thread has exited (shutdown or crash)
+                break
+            temperature_reading, pressure_reading, humidity_reading, clear_channel = reading
 
-            # Calculate dew point using the Magnus formula for better
-            # accuracy across a wider temperature/humidity range.
             try:
-                # Magnus constants for water vapor over liquid water
-                a: float = 17.27
-                b: float = 237.7
-                # Protect against invalid humidity values (<=0)
-                rh_fraction: float = max(min(humidity_reading / 100.0, 1.0), 1e-6)
-                gamma = (a * temperature_reading) / (b + temperature_reading) + math.log(rh_fraction)
-                dewpoint = (b * gamma) / (a - gamma)
-            except (OverflowError, ValueError, ZeroDivisionError):
-                # Fallback to the original simple approximation if something goes wrong
-                logging.exception("Magnus dew point calculation failed; using fallback")
-                dewpoint = temperature_reading - ((100 - humidity_reading) / 5)
-
-            # Keep numeric values and round when publishing/storing
-            temperature_r: float = round(temperature_reading, 1)
-            pressure_r: float = round(pressure_reading, 1)
-            humidity_r: float = round(humidity_reading, 1)
-            lx_r: float = round(lx, 1)
-            ambient_lux_r: float = round(ambient_lux, 1)
-            dewpoint_r: float = round(dewpoint, 1)
-
-            # Check for a bad reading from the sensors (sensor's known invalid startup values)
-            if not (temperature_r == 22.0 and humidity_r == 82.3 and pressure_r == 684.3):
-                # Insert the readings into the SQL database
-                if usesql:
-                    # Ensure DB connection is alive, try reconnect if not
-                    if conn is None or not (getattr(conn, 'is_connected', lambda: True)() if conn is not None else False):
-                        logging.warning("DB connection lost or not present; attempting reconnect")
-                        conn = connect_db()
-                        if conn is not None:
-                            try:
-                                cursor = conn.cursor()
-                            except mysql.connector.Error as e:
-                                logging.error("Failed to create DB cursor after reconnect: %s", e)
-                                cursor = None
-
-                    if conn is not None and cursor is not None:
-                        try:
-                            cursor.execute(
-                                "INSERT INTO Readings (Humidity, Pressure, Temperature, Lux, AmbientLux) VALUES (%s, %s, %s, %s, %s)",
-                                (humidity_r, pressure_r, temperature_r, lx_r, ambient_lux_r)
-                            )
-                            conn.commit()
-                        except mysql.connector.Error as e:
-                            logging.error("Database insert failed: %s", e)
-                            try:
-                                conn.close()
-                            except mysql.connector.Error:
-                                pass
-                            conn = None
-                            cursor = None
-
-                # Prepare the MQTT payload
-                mqtt_payload = json.dumps({
-                    "temperature": temperature_r,
-                    "pressure": pressure_r,
-                    "humidity": humidity_r,
-                    "dew_point": dewpoint_r,
-                    "lx": lx_r,
-                    "ambient_lux": ambient_lux_r
-                })
+                # Apply per-sensor calibration offsets (configurable in readings.ini).
+                # The offsets are validated as floats by load_config at startup.
+                temperature_reading += cal_temp
+                pressure_reading += cal_pressure
+                humidity_reading += cal_humidity
+                # Apply lux calibration to the raw c channel before conversion
+                clear_channel += cal_lux
+
+                # Round the values used to spot the sensor's known-bad startup
+                # reading first, so discarded readings skip the derived metrics
+                temperature_r: float = _round(temperature_reading, 1)
+                pressure_r: float = _round(pressure_reading, 1)
+                humidity_r: float = _round(humidity_reading, 1)
+
+                # Check for a bad reading from the sensors (sensor's known invalid startup values)
+                fingerprint = (_round(temperature_reading * 10), _round(humidity_reading * 10), _round(pressure_reading * 10))
+                if fingerprint == STARTUP_FINGERPRINT:
+                    bad_readings += 1
+                    # Rate-limit the warning in case the sensor keeps returning it
+                    if bad_readings % BAD_READING_LOG_EVERY == 1:
+                        _warning("Bad sensor reading detected (%d so far): temp=%s hum=%s pres=%s", bad_readings, temperature_r, humidity_r, pressure_r)
+                    continue
+
+                # Calculate lux from colour sensor data
+                lx_tmp = clear_channel / 1.638375
+                lx = min(max(_round(lx_tmp, -2), 0), 40000)
+                ambient_lux = min(lx, 10000)
+
+                # Calculate dew point using the Magnus formula for better
+                # accuracy across a wider temperature/humidity range.
+                try:
+                    # Protect against invalid humidity values (<=0)
+                    rh_fraction: float = humidity_reading * INV_100
+                    rh_fraction = 1e-6 if rh_fraction < 1e-6 else 1.0 if rh_fraction > 1.0 else rh_fraction
+                    gamma = (MAGNUS_A * temperature_reading) / (MAGNUS_B + temperature_reading) + _log(rh_fraction)
+                    dewpoint = (MAGNUS_B * gamma) / (MAGNUS_A - gamma)
+                except (OverflowError, ValueError, ZeroDivisionError):
+                    # Fallback to the original simple approximation if something goes wrong
+                    logging.exception("Magnus dew point calculation failed; using fallback")
+                    dewpoint = temperature_reading - ((100 - humidity_reading) / 5)
+
+                # Round the derived values when publishing/storing
+                lx_r: float = _round(lx, 1)
+                ambient_lux_r: float = _round(ambient_lux, 1)
+                dewpoint_r: float = _round(dewpoint, 1)
+
+                # Buffer the readings and write them to the SQL database in batches
+                if db_writer is not None:
+                    db_writer.add_reading((humidity_r, pressure_r, temperature_r, lx_r, ambient_lux_r))
+
+                # Prepare the MQTT payload. The schema is fixed and every value
+                # is a number, so a template gives the same output as
+                # json.dumps without building an intermediate dict.
+                mqtt_payload = (
+                    f'{{"temperature": {temperature_r}, "pressure": {pressure_r}, '
+                    f'"humidity": {humidity_r}, "dew_point": {dewpoint_r}, '
+                    f'"lx": {lx_r}, "ambient_lux": {ambient_lux_r}}}'
+                )
 
                 # Publish the readings to each MQTT server
                 for client in mqtt_clients:
                     try:
-                        result = client.publish(topic + "WeatherData", mqtt_payload)
+                        # QoS 0 retained: a periodic "latest reading" feed, so late
+                        # subscribers get the current values immediately
+                        result = client.publish(full_topic, mqtt_payload, qos=0, retain=True)
                         status = result[0]
-                        if status == 0:
-                            logging.debug("Published message to %s", topic)
+                        if status == mqtt_client.MQTT_ERR_SUCCESS:
+                            _debug("Published message to %s", full_topic)
                         else:
-                            logging.warning("Client failed to send message to topic %s (status=%s)", topic, status)
+                            # e.g. MQTT_ERR_NO_CONN while paho is still reconnecting;
+                            # the reading is skipped rather than waiting on the broker
+                            _warning("Client failed to send message to topic %s (status=%s: %s)", full_topic, status, mqtt_client.error_string(status))
                     except (OSError, RuntimeError) as e:
-                        logging.exception("Client failed to send message to topic %s: %s", topic, e)
-                        # Attempt to reconnect this client
-                        try:
-                            client.reconnect()
-                        except (OSError, RuntimeError):
-                            pass
-            else:
-                logging.warning("Bad sensor reading detected: temp=%s hum=%s pres=%s", temperature_r, humidity_r, pressure_r)
+                        # paho's network loop reconnects in the background
+                        logging.exception("Client failed to send message to topic %s: %s", full_topic, e)
+
+            except (OSError, RuntimeError, ValueError):
+                logging.exception("Unexpected error in sensor loop; continuing")
 
-        except (OSError, RuntimeError, ValueError):
-            logging.exception("Unexpected error in sensor loop; continuing")
+        # Write out any readings still buffered before shutting down
+        if db_writer is not None:
+            db_writer.flush_on_shutdown()
+    finally:
+        # Close the live DB connection, which may be one opened by a reconnect
+        if db_writer is not None:
+            db_writer.close()
+        elif conn is not None:
+            try:
+                conn.close()
+            except DB_ERRORS:
+                pass
 
-        # Wait for the configured interval before repeating
-        time.sleep(refresh_interval)
+    if not shutdown_event.is_set():
+        raise RuntimeError("Sensor reader thread stopped unexpectedly")
 
 def signal_handler(signum, frame):
     """Handle shutdown signals for graceful termination.
@@ -411,16 +754,15 @@ def signal_handler(signum, frame):
         signum: Signal number received
         frame: Current stack frame
     """
-    global shutdown_requested
     signal_name = signal.Signals(signum).name
     logging.info("Received %s signal, initiating graceful shutdown...", signal_name)
-    shutdown_requested = True
+    shutdown_event.set()
 
 def run():
     """Application entry point.
 
-    Sets up MQTT clients and DB connection (if enabled), starts the
-    MQTT network loops, then enters the sensor publishing loop. Ensures
+    Sets up MQTT clients (each with its network loop started) and the
+    DB connection (if enabled), then enters the sensor publishing loop. Ensures
     graceful shutdown of clients and DB on exit.
     """
     # Register signal handlers for graceful shutdown
@@ -429,21 +771,24 @@ def run():
     
     logging.info("Starting WeatherPi readings service...")
     
-    for brokerep in brokers:
-        client = connect_mqtt(brokerep)
-        clients.append(client)
+    # connect_mqtt only schedules the connection on paho's network thread,
+    # so the brokers are set up one after another without blocking
+    for brokerep in cfg.brokers:
+        clients.append(connect_mqtt(brokerep))
 
     conn = None
-    if usesql:
-        conn = connect_db()
+    if cfg.usesql:
+        conn = connect_db(cfg)
 
-    for client in clients:
-        client.loop_start()
+    # Read the sensors on their own thread so I2C waits overlap with
+    # MQTT/DB work in the publishing loop
+    sensor_thread = threading.Thread(target=read_sensors, args=(cfg.refresh_interval,), name="sensor-reader", daemon=True)
+    sensor_thread.start()
 
     try:
-        publish_sensor(clients, conn)
+        publish_sensor(clients, conn, cfg, sensor_thread)
     finally:
-        # Graceful shutdown: stop MQTT loops and close DB connection
+        # Graceful shutdown: stop MQTT loops (publish_sensor closes the DB connection)
         logging.info("Shutting down WeatherPi readings service...")
         for client in clients:
             try:
@@ -451,11 +796,6 @@ def run():
                 client.disconnect()
             except (OSError, RuntimeError):
                 pass
-        if conn is not None:
-            try:
-                conn.close()
-            except mysql.connector.Error:
-                pass
         logging.info("WeatherPi readings service stopped cleanly")
 
 if __name__ == '__main__':
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CNSoft.WeatherPi.Readings.V2")
+
+
+@pytest.fixture(scope="session")
+def readings():
+    """Import readings.py with simulated sensors and no config file."""
+    os.environ["SIMULATE_SENSORS"] = "1"
+    os.environ.setdefault("MQTT_BROKERS", "[]")
+    sys.argv = ["readings.py", "-c", os.path.join(APP_DIR, "missing.ini")]
+    sys.path.insert(0, APP_DIR)
+    import readings as module
+    return module
@@ -0,0 +1,129 @@
+import dataclasses
+
+import mysql.connector
+import pytest
+
+ROW = (50.0, 1013.2, 21.5, 300.0, 300.0)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def executemany(self, sql, rows):
+        if self.conn.errors:
+            raise self.conn.errors.pop(0)
+        self.conn.written.extend(rows)
+
+
+class FakeConnection:
+    """Stands in for a mysql.connector connection.
+
+    Each queued error is raised by the next `executemany`.
+    """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.written = []
+        self.closed = False
+        self.rolled_back = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+
+def lost_connection():
+    # 2006 "server has gone away" is a plain DatabaseError, not an OperationalError
+    return mysql.connector.errors.get_mysql_exception(2006, "MySQL server has gone away", "HY000")
+
+
+@pytest.fixture
+def writer(readings, monkeypatch):
+    """Return a factory for a DbWriter that flushes every reading."""
+    readings.pending_rows.clear()
+    reconnects = []
+
+    def make(conn, *fresh_conns):
+        fresh = list(fresh_conns)
+
+        def reconnect_db(_cfg):
+            reconnects.append(1)
+            new_conn = fresh.pop(0) if fresh else None
+            return (new_conn, new_conn.cursor()) if new_conn else (None, None)
+
+        monkeypatch.setattr(readings, "reconnect_db", reconnect_db)
+        cfg = dataclasses.replace(readings.cfg, usesql=True, dbbatchsize=1)
+        return readings.DbWriter(cfg, conn), reconnects
+
+    yield make
+    readings.pending_rows.clear()
+
+
+def test_established_connection_failure_retries_once(readings, writer):
+    stale = FakeConnection(lost_connection())
+    fresh = FakeConnection()
+    db_writer, reconnects = writer(stale, fresh)
+
+    db_writer.add_reading(ROW)
+
+    assert stale.closed
+    assert len(reconnects) == 1
+    assert fresh.written == [ROW]
+    assert readings.pending_rows == []
+    assert db_writer.retry_at == 0.0
+
+
+def test_fresh_connection_failure_backs_off(readings, writer):
+    fresh = FakeConnection(lost_connection())
+    db_writer, reconnects = writer(None, fresh)
+
+    db_writer.add_reading(ROW)
+
+    assert fresh.closed
+    assert db_writer.conn is None
+    assert db_writer.retry_delay == readings.DB_RECONNECT_MIN_DELAY * 2
+    assert readings.pending_rows == [ROW]
+
+    # Still backing off: no reconnect attempt for the next reading
+    db_writer.add_reading(ROW)
+    assert len(reconnects) == 1
+    assert readings.pending_rows == [ROW, ROW]
+
+
+def test_rejected_batch_is_discarded(readings, writer):
+    rejected = mysql.connector.errors.get_mysql_exception(1406, "Data too long", "22001")
+    conn = FakeConnection(rejected)
+    db_writer, reconnects = writer(conn)
+
+    db_writer.add_reading(ROW)
+
+    assert conn.rolled_back
+    assert not conn.closed
+    assert db_writer.conn is conn
+    assert reconnects == []
+    assert readings.pending_rows == []
+
+
+def test_lost_connection_keeps_rows(readings, writer):
+    stale = FakeConnection(lost_connection())
+    fresh = FakeConnection(mysql.connector.errors.OperationalError("Lost connection", errno=2013))
+    db_writer, reconnects = writer(stale, fresh)
+
+    db_writer.add_reading(ROW)
+
+    assert stale.closed and fresh.closed
+    assert len(reconnects) == 1
+    assert db_writer.conn is None
+    assert readings.pending_rows == [ROW]
+
+    db_writer.close()
+    assert db_writer.conn is None